@@ -1,24 +1,166 @@
 #!/usr/bin/env python3
+import os
 import sys
-import json
-import networkx as nx
-from collections import defaultdict
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, maximum_flow
+
+if not __package__:
+    # Run as a script (python belts/main.py): make the shared solver_io module next to this package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from solver_io import run_solver_cli
 
 NUMERICAL_TOLERANCE = 1e-9
+# csgraph.maximum_flow only accepts int32 capacities, so flows are solved in fixed-point units of 10**-exponent.
+# The exponent is the largest one keeping the total demand within MAX_SCALED_CAPACITY units, so decimal inputs
+# with up to that many fractional digits are represented exactly; the rest is left to the float checks in solve()
+DEFAULT_SCALE_EXPONENT = 6
+MAX_SCALED_CAPACITY = 2 ** 30
+# Scaled values this close to an integer are float noise from the conversion and snap to it before rounding
+FIXED_POINT_SNAP = 1e-6
+
+
+def _float_slack(magnitudes):
+    """Allowed float error around values of the given magnitudes: the absolute tolerance plus a few ulps."""
+    return NUMERICAL_TOLERANCE + 4 * np.finfo(np.float64).eps * np.abs(magnitudes)
+
+
+def _scale_exponent(total_demand):
+    """Picks the power of ten that resolves flows most finely while total demand stays within MAX_SCALED_CAPACITY."""
+    if total_demand <= NUMERICAL_TOLERANCE:
+        return DEFAULT_SCALE_EXPONENT
+    return int(np.floor(np.log10(MAX_SCALED_CAPACITY / total_demand)))
+
+
+def _to_fixed_point(values, scale_exponent):
+    """Converts amounts per minute to (unrounded) fixed-point units; powers of ten are exact floats either way."""
+    if scale_exponent >= 0:
+        return values * 10.0 ** scale_exponent
+    return values / 10.0 ** -scale_exponent
+
+
+def _from_fixed_point(units, scale_exponent):
+    """Converts fixed-point units back to amounts per minute."""
+    if scale_exponent >= 0:
+        return units / 10.0 ** scale_exponent
+    return units * 10.0 ** -scale_exponent
+
+
+def _gather_arc_flows(flow_matrix, arc_tails, arc_heads):
+    """Reads every arc's flow out of the CSR flow matrix in one pass, as a flat array aligned with the arc table."""
+    if len(arc_tails) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # The flow matrix is antisymmetric, so antiparallel arcs report their net flow and the negative side carries nothing
+    return np.maximum(np.asarray(flow_matrix[arc_tails, arc_heads]).ravel(), 0)
+
+
+def _node_excess(arc_tails, arc_heads, flows, super_node_ids, num_nodes):
+    """Inflow minus outflow at every node, with the super source and sink (which only balance overall) zeroed."""
+    node_excess = (np.bincount(arc_heads, weights=flows, minlength=num_nodes)
+                   - np.bincount(arc_tails, weights=flows, minlength=num_nodes))
+    node_excess[list(super_node_ids)] = 0.0
+    return node_excess
+
+
+def _flow_fits(arc_tails, arc_heads, capacities, flows, is_fixed_arc, super_node_ids, num_nodes):
+    """Checks a float flow against exact capacities: within every capacity, fixed arcs full, and conserved at nodes."""
+    node_throughput = np.bincount(arc_heads, weights=flows, minlength=num_nodes)
+    node_excess = _node_excess(arc_tails, arc_heads, flows, super_node_ids, num_nodes)
+    return bool(np.all(flows <= capacities + _float_slack(capacities))
+                and np.all(np.abs(capacities - flows)[is_fixed_arc] <= _float_slack(capacities[is_fixed_arc]))
+                and np.all(np.abs(node_excess) <= _float_slack(node_throughput)))
+
+
+def _repair_float_flows(arc_tails, arc_heads, capacities, flows, is_fixed_arc, super_node_ids, num_nodes):
+    """Moves a rounded fixed-point flow onto exact float capacities.
+
+    Fixed arcs (the super-source and super-sink arcs) are set to their exact capacity and every other arc is clipped
+    to it; the small excesses this leaves at nodes are then pushed along shortest residual paths, in floats, from
+    nodes with surplus to nodes with shortfall. Returns the repaired flows; leftover excess means no exact flow
+    was found near the rounded one.
+    """
+    flows = np.where(is_fixed_arc, capacities, np.minimum(flows, capacities))
+    node_excess = _node_excess(arc_tails, arc_heads, flows, super_node_ids, num_nodes)
+    adjustable_arcs = np.nonzero(~is_fixed_arc)[0].tolist()
+    outgoing_arcs = [[] for _ in range(num_nodes)]
+    incoming_arcs = [[] for _ in range(num_nodes)]
+    for arc_idx in adjustable_arcs:
+        outgoing_arcs[arc_tails[arc_idx]].append(arc_idx)
+        incoming_arcs[arc_heads[arc_idx]].append(arc_idx)
+
+    for _ in range(len(adjustable_arcs) * num_nodes + 1):
+        surplus_nodes = np.nonzero(node_excess > NUMERICAL_TOLERANCE * 1e-3)[0].tolist()
+        if not surplus_nodes:
+            break
+        # Breadth-first search over residual arcs: forward where capacity remains, backward where flow can be undone
+        predecessor = {node: None for node in surplus_nodes}
+        frontier = list(surplus_nodes)
+        shortfall_node = None
+        while frontier and shortfall_node is None:
+            next_frontier = []
+            for node in frontier:
+                steps = [(arc_idx, arc_heads[arc_idx], 1) for arc_idx in outgoing_arcs[node] if capacities[arc_idx] - flows[arc_idx] > 0]
+                steps += [(arc_idx, arc_tails[arc_idx], -1) for arc_idx in incoming_arcs[node] if flows[arc_idx] > 0]
+                for arc_idx, neighbor, direction in steps:
+                    if neighbor in predecessor:
+                        continue
+                    predecessor[neighbor] = (node, arc_idx, direction)
+                    if node_excess[neighbor] < 0:
+                        shortfall_node = neighbor
+                        break
+                    next_frontier.append(neighbor)
+                if shortfall_node is not None:
+                    break
+            frontier = next_frontier
+        if shortfall_node is None:
+            break
+
+        path = []
+        node = shortfall_node
+        while predecessor[node] is not None:
+            previous_node, arc_idx, direction = predecessor[node]
+            path.append((arc_idx, direction))
+            node = previous_node
+        amount = min(node_excess[node], -node_excess[shortfall_node])
+        for arc_idx, direction in path:
+            amount = min(amount, capacities[arc_idx] - flows[arc_idx] if direction > 0 else flows[arc_idx])
+        for arc_idx, direction in path:
+            flows[arc_idx] = min(capacities[arc_idx], max(0.0, flows[arc_idx] + direction * amount))
+        node_excess[node] -= amount
+        node_excess[shortfall_node] += amount
+    return flows
+
+
+def _source_side_mask(capacity_graph, flow_matrix, sink_id):
+    """Marks the source side of the min cut: every node that can no longer reach the sink in the residual graph."""
+    residual_graph = (capacity_graph - flow_matrix).tocsr()
+    residual_graph.data[residual_graph.data < 0] = 0
+    residual_graph.eliminate_zeros()
+    # Walk residual arcs backwards from the sink to find every node that still has a path into it
+    reaches_sink = breadth_first_order(residual_graph.T.tocsr(), sink_id, directed=True, return_predecessors=False)
+    source_side_mask = np.ones(capacity_graph.shape[0], dtype=np.bool_)
+    source_side_mask[reaches_sink] = False
+    return source_side_mask
+
+
+def _saturated_cut_arcs(arc_tails, arc_heads, arc_capacities, arc_flows, source_reachable_mask):
+    """Flags arcs that cross from the source side of the cut to the sink side with no residual capacity."""
+    crosses_cut = source_reachable_mask[arc_tails] & ~source_reachable_mask[arc_heads]
+    return crosses_cut & (arc_capacities - arc_flows <= 0)
 
 class BeltsSolver:
     """Solves the network flow problem with lower bounds on edges and capacity constraints on nodes."""
-    
+
     def __init__(self, data):
         self.data = data
         self.network_nodes = list(self.data.get('nodes', []))
         self.network_edges = [dict(edge) for edge in self.data.get('edges', [])]
-        
-        # Ensure all edges have lower bounds
+
+        # Ensure all edges have lower bounds, and coerce both bounds to floats once here
         for edge in self.network_edges:
-            if 'lo' not in edge:
-                edge['lo'] = 0.0
-        
+            edge['lo'] = float(edge.get('lo', 0.0))
+            edge['hi'] = float(edge['hi'])
+
         self.node_capacity_map = {nc['name']: float(nc['cap']) for nc in self.data.get('node_caps', [])}
         self.source_supply_map = {s['name']: float(s['supply']) for s in self.data.get('sources', [])}
         self.sink_node = self.data['sink']['name']
@@ -40,103 +182,181 @@ class BeltsSolver:
                 external_node_map[node] = node
         return internal_node_map, external_node_map
 
+    def _build_flow_network(self, network_arcs, total_demand, node_id, round_demand_up=False):
+        """Builds the transformed network over the node ids in node_id as an int32 CSR capacity matrix for csgraph.maximum_flow.
+
+        By default demand arcs out of the super source round down and every real capacity rounds up, so a network
+        that is feasible in exact arithmetic stays feasible in fixed point. round_demand_up flips both directions,
+        so a network that is feasible in fixed point is feasible in exact arithmetic.
+        """
+        arc_table = np.array(network_arcs, dtype=np.float64).reshape(-1, 3)
+        arc_tails = arc_table[:, 0].astype(np.int32)
+        arc_heads = arc_table[:, 1].astype(np.int32)
+        real_capacities = arc_table[:, 2]
+
+        scale_exponent = _scale_exponent(total_demand)
+        scaled_capacities = _to_fixed_point(real_capacities, scale_exponent)
+        nearest_units = np.rint(scaled_capacities)
+        is_exact = np.abs(scaled_capacities - nearest_units) <= FIXED_POINT_SNAP
+        is_demand_arc = arc_tails == node_id[self.SUPER_SOURCE]
+        rounds_up = is_demand_arc == round_demand_up
+        scaled_capacities = np.where(is_exact, nearest_units, np.where(rounds_up, np.ceil(scaled_capacities), np.floor(scaled_capacities)))
+
+        # No arc can carry more than the total demand, so clip there to keep every capacity inside int32
+        capacity_limit = scaled_capacities[is_demand_arc].sum()
+        scaled_capacities = np.minimum(scaled_capacities, capacity_limit).astype(np.int32)
+
+        num_nodes = len(node_id)
+        capacity_graph = csr_matrix((scaled_capacities, (arc_tails, arc_heads)), shape=(num_nodes, num_nodes))
+        return {
+            "graph": capacity_graph,
+            "arc_tails": arc_tails,
+            "arc_heads": arc_heads,
+            "arc_capacities": scaled_capacities,
+            "real_capacities": real_capacities,
+            "is_demand_arc": is_demand_arc,
+            "scale_exponent": scale_exponent,
+        }
+
+    def _solve_flow_network(self, flow_network, super_source_id, super_sink_id):
+        """Runs Dinic max-flow on a built network; returns the flat per-arc flows and whether every demand arc is met."""
+        flow_result = maximum_flow(flow_network["graph"], super_source_id, super_sink_id, method='dinic')
+        # Per-arc flow in scaled units; every later lookup indexes this flat array by arc position
+        arc_flows = _gather_arc_flows(flow_result.flow, flow_network["arc_tails"], flow_network["arc_heads"])
+        required_units = int(flow_network["arc_capacities"][flow_network["is_demand_arc"]].sum())
+        return flow_result, arc_flows, flow_result.flow_value >= required_units
+
     def solve(self):
         internal_node_map, external_node_map = self._get_internal_node_maps()
 
+        # Intern every mapped node to a small int id; arcs, pairs and cut masks are all keyed by id
+        mapped_node_set = set(internal_node_map.values()) | set(external_node_map.values())
+        mapped_node_names = sorted(mapped_node_set | {self.SUPER_SOURCE, self.SUPER_SINK})
+        node_id = {name: i for i, name in enumerate(mapped_node_names)}
+        internal_id = {node: node_id[mapped_node] for node, mapped_node in internal_node_map.items()}
+        external_id = {node: node_id[mapped_node] for node, mapped_node in external_node_map.items()}
+        super_source_id = node_id[self.SUPER_SOURCE]
+        super_sink_id = node_id[self.SUPER_SINK]
+
         # Build reduced capacities (hi - lo) and validate
-        mapped_edge_pairs = defaultdict(list)
+        # Parallel edges that map to the same (tail, head) pair share one arc; pair ids follow first appearance
+        # Original nodes get dense positions too, so per-node sums over edges reduce to bincounts
+        node_index = {}
+        for node in self.network_nodes:
+            node_index.setdefault(node, len(node_index))
+        pair_index = {}
+        edge_pair_ids = np.zeros(len(self.network_edges), dtype=np.int32)
+        edge_source_idx = np.zeros(len(self.network_edges), dtype=np.int32)
+        edge_target_idx = np.zeros(len(self.network_edges), dtype=np.int32)
+        edge_reduced_caps = np.zeros(len(self.network_edges))
+        edge_lower_bounds = np.zeros(len(self.network_edges))
         for edge_idx, edge in enumerate(self.network_edges):
             source_node = edge['from']
             target_node = edge['to']
-            lower_bound = float(edge.get('lo', 0.0))
-            upper_bound = float(edge['hi'])
+            lower_bound = edge['lo']
+            upper_bound = edge['hi']
             if upper_bound + NUMERICAL_TOLERANCE < lower_bound:
                 return {"status": "error", "message": f"edge {source_node}->{target_node} has hi < lo"}
             reduced_capacity = upper_bound - lower_bound
-            mapped_source = external_node_map[source_node]
-            mapped_target = internal_node_map[target_node]
-            mapped_edge_pairs[(mapped_source, mapped_target)].append({
-                "idx": edge_idx, "from": source_node, "to": target_node, "lo": lower_bound, "hi": upper_bound, "reduced": reduced_capacity
-            })
+            edge_lower_bounds[edge_idx] = lower_bound
+            edge_reduced_caps[edge_idx] = reduced_capacity
+            mapped_pair = (external_id[source_node], internal_id[target_node])
+            edge_pair_ids[edge_idx] = pair_index.setdefault(mapped_pair, len(pair_index))
+            edge_source_idx[edge_idx] = node_index[source_node]
+            edge_target_idx[edge_idx] = node_index[target_node]
+        pair_total_caps = np.bincount(edge_pair_ids, weights=edge_reduced_caps, minlength=len(pair_index))
 
         # Compute B(v) = sum lo_in - sum lo_out
-        node_imbalance = defaultdict(float)
-        for edge in self.network_edges:
-            lower_bound = float(edge.get('lo', 0.0))
-            node_imbalance[edge['to']] += lower_bound
-            node_imbalance[edge['from']] -= lower_bound
+        num_original_nodes = len(node_index)
+        node_imbalance = (np.bincount(edge_target_idx, weights=edge_lower_bounds, minlength=num_original_nodes)
+                          - np.bincount(edge_source_idx, weights=edge_lower_bounds, minlength=num_original_nodes))
 
         # R(v) = B(v) + supply(v) - demand(v)
-        node_requirement = {}
-        for node in self.network_nodes:
-            supply = float(self.source_supply_map.get(node, 0.0))
-            demand = float(self.total_supply_amount if node == self.sink_node else 0.0)
-            node_requirement[node] = node_imbalance[node] + supply - demand
+        node_supply = np.zeros(num_original_nodes)
+        for node, supply in self.source_supply_map.items():
+            if node in node_index:
+                node_supply[node_index[node]] = supply
+        node_demand = np.zeros(num_original_nodes)
+        if self.sink_node in node_index:
+            node_demand[node_index[self.sink_node]] = self.total_supply_amount
+        node_requirement = (node_imbalance + node_supply - node_demand).tolist()
 
-        flow_graph = nx.DiGraph()
-        mapped_node_set = set(internal_node_map.values()) | set(external_node_map.values())
-        for mapped_node in mapped_node_set:
-            flow_graph.add_node(mapped_node)
-        
+        # Arcs of the transformed network: merged edge pairs first, then node splits, then super arcs
+        network_arcs = []
+        for (source_id, target_id), pair_total_cap in zip(pair_index, pair_total_caps.tolist()):
+            network_arcs.append((source_id, target_id, pair_total_cap))
+
+        split_arc_index = {}
         for node, capacity in self.node_capacity_map.items():
-            if internal_node_map[node] != external_node_map[node]:
-                flow_graph.add_edge(internal_node_map[node], external_node_map[node], capacity=float(capacity))
-        
-        for (mapped_source, mapped_target), edge_info_list in mapped_edge_pairs.items():
-            total_reduced_cap = sum(item["reduced"] for item in edge_info_list)
-            flow_graph.add_edge(mapped_source, mapped_target, capacity=float(total_reduced_cap))
-
-        flow_graph.add_node(self.SUPER_SOURCE)
-        flow_graph.add_node(self.SUPER_SINK)
+            if internal_id[node] != external_id[node]:
+                split_arc_index[node] = len(network_arcs)
+                network_arcs.append((internal_id[node], external_id[node], capacity))
+
         total_demand = 0.0
         for node in self.network_nodes:
-            requirement = node_requirement[node]
-            node_internal = internal_node_map[node]
-            node_external = external_node_map[node]
+            requirement = node_requirement[node_index[node]]
             if requirement > NUMERICAL_TOLERANCE:
-                flow_graph.add_edge(self.SUPER_SOURCE, node_internal, capacity=float(requirement))
+                network_arcs.append((super_source_id, internal_id[node], requirement))
                 total_demand += requirement
             elif requirement < -NUMERICAL_TOLERANCE:
-                flow_graph.add_edge(node_external, self.SUPER_SINK, capacity=float(-requirement))
+                network_arcs.append((external_id[node], super_sink_id, -requirement))
 
+        flow_network = self._build_flow_network(network_arcs, total_demand, node_id)
         try:
-            max_flow_value, flow_dict = nx.maximum_flow(flow_graph, self.SUPER_SOURCE, self.SUPER_SINK,
-                                                  capacity='capacity',
-                                                  flow_func=nx.algorithms.flow.preflow_push)
+            flow_result, arc_flows, meets_demand = self._solve_flow_network(flow_network, super_source_id, super_sink_id)
         except Exception as exc:
             return {"status": "error", "message": f"maxflow error: {exc}"}
 
-        if abs(max_flow_value - total_demand) > 1e-9:
-            return self._format_infeasible(flow_graph, max_flow_value, total_demand, flow_dict, internal_node_map, external_node_map, mapped_edge_pairs)
-
-        original_edge_flows = [0.0] * len(self.network_edges)
-        for (mapped_source, mapped_target), edge_info_list in mapped_edge_pairs.items():
-            flow_on_mapped = float(flow_dict.get(mapped_source, {}).get(mapped_target, 0.0))
-            total_reduced_cap = sum(item["reduced"] for item in edge_info_list)
-            if total_reduced_cap > NUMERICAL_TOLERANCE:
-                for item in edge_info_list:
-                    share = (item["reduced"] / total_reduced_cap) * flow_on_mapped
-                    original_edge_flows[item["idx"]] = share
-            else:
-                for item in edge_info_list:
-                    original_edge_flows[item["idx"]] = 0.0
+        if not meets_demand:
+            # Conservative rounding can only help feasibility, so this network is infeasible in exact arithmetic too;
+            # the min cut is read off the residual of this same max-flow rather than solving a second one
+            source_reachable_mask = _source_side_mask(flow_network["graph"], flow_result.flow, super_sink_id)
+            return self._format_infeasible(flow_network, mapped_node_names, source_reachable_mask, arc_flows, total_demand, split_arc_index, edge_pair_ids, len(pair_index))
 
-        final_flows = []
-        for edge_idx, edge in enumerate(self.network_edges):
-            flow_value = original_edge_flows[edge_idx] + float(edge.get('lo', 0.0))
-            if flow_value > NUMERICAL_TOLERANCE:
-                final_flows.append({"from": edge['from'], "to": edge['to'], "flow": float(flow_value)})
+        # Accept the fixed-point flow only once, back in floats, it respects every capacity and meets every demand
+        # and supply; rounded capacities can leave it up to one unit per arc off, which a float repair pass removes
+        arc_network = (flow_network["arc_tails"], flow_network["arc_heads"], flow_network["real_capacities"])
+        is_super_arc = flow_network["is_demand_arc"] | (flow_network["arc_heads"] == super_sink_id)
+        flow_checks = (is_super_arc, (super_source_id, super_sink_id), len(node_id))
+        real_arc_flows = _from_fixed_point(arc_flows.astype(np.float64), flow_network["scale_exponent"])
+        if not _flow_fits(*arc_network, real_arc_flows, *flow_checks):
+            real_arc_flows = _repair_float_flows(*arc_network, real_arc_flows, *flow_checks)
+        if not _flow_fits(*arc_network, real_arc_flows, *flow_checks):
+            # Rounding the other way: a cut whose exact capacity falls short of the demand proves infeasibility
+            pessimistic_network = self._build_flow_network(network_arcs, total_demand, node_id, round_demand_up=True)
+            flow_result, arc_flows, meets_demand = self._solve_flow_network(pessimistic_network, super_source_id, super_sink_id)
+            if not meets_demand:
+                source_reachable_mask = _source_side_mask(pessimistic_network["graph"], flow_result.flow, super_sink_id)
+                infeasible_report = self._format_infeasible(pessimistic_network, mapped_node_names, source_reachable_mask, arc_flows, total_demand, split_arc_index, edge_pair_ids, len(pair_index))
+                if infeasible_report["deficit"]["demand_balance"] > NUMERICAL_TOLERANCE:
+                    return infeasible_report
+            resolution = _from_fixed_point(1.0, flow_network["scale_exponent"])
+            return {"status": "error", "message": f"flows cannot be resolved within tolerance at a fixed-point resolution of {resolution:g}"}
 
-        final_flows.sort(key=lambda x: (x['from'], x['to']))
+        # Split each pair's flow across its edges in proportion to their reduced capacity
+        pair_flows = real_arc_flows[:len(pair_index)]
+        edge_pair_totals = pair_total_caps[edge_pair_ids]
+        has_capacity = edge_pair_totals > NUMERICAL_TOLERANCE
+        safe_pair_totals = np.where(has_capacity, edge_pair_totals, 1.0)
+        original_edge_flows = np.where(has_capacity, edge_reduced_caps / safe_pair_totals * pair_flows[edge_pair_ids], 0.0)
+
+        # Keep edges with positive total flow, ordered by (from, to); lexsort is stable so ties keep input order
+        total_edge_flows = original_edge_flows + edge_lower_bounds
+        keep_idx = np.nonzero(total_edge_flows > NUMERICAL_TOLERANCE)[0]
+        edge_sources = np.array([self.network_edges[edge_idx]['from'] for edge_idx in keep_idx])
+        edge_targets = np.array([self.network_edges[edge_idx]['to'] for edge_idx in keep_idx])
+        sorted_order = np.lexsort((edge_targets, edge_sources)) if len(keep_idx) else []
+        final_flows = [
+            {"from": self.network_edges[keep_idx[i]]['from'], "to": self.network_edges[keep_idx[i]]['to'], "flow": float(total_edge_flows[keep_idx[i]])}
+            for i in sorted_order
+        ]
         return {"status": "ok", "max_flow_per_min": float(self.total_supply_amount), "flows": final_flows}
 
-    def _format_infeasible(self, flow_graph, max_flow_value, required_demand, flow_dict, internal_node_map, external_node_map, mapped_edge_pairs):
+    def _format_infeasible(self, flow_network, mapped_node_names, source_reachable_mask, arc_flows, required_demand, split_arc_index, edge_pair_ids, num_pairs):
         """Generates infeasibility report with min-cut information."""
-        min_cut_value, (source_reachable, sink_reachable) = nx.minimum_cut(flow_graph, self.SUPER_SOURCE, self.SUPER_SINK,
-                                                   capacity='capacity',
-                                                   flow_func=nx.algorithms.flow.preflow_push)
         reachable_original_nodes = set()
-        for mapped_node in source_reachable:
+        for reachable_id in np.nonzero(source_reachable_mask)[0]:
+            mapped_node = mapped_node_names[reachable_id]
             if mapped_node in (self.SUPER_SOURCE, self.SUPER_SINK):
                 continue
             if '__' in mapped_node:
@@ -146,33 +366,34 @@ class BeltsSolver:
             reachable_original_nodes.add(base_node)
         cut_reachable_nodes = sorted(reachable_original_nodes)
 
-        deficit_amount = float(required_demand - max_flow_value)
+        # Saturation and cut crossing are evaluated over whole arc arrays in scaled units
+        arc_tails = flow_network["arc_tails"]
+        arc_heads = flow_network["arc_heads"]
+        arc_capacities = flow_network["arc_capacities"]
+        saturated_arcs = arc_capacities - arc_flows <= 0
+        tight_cut_arcs = _saturated_cut_arcs(arc_tails, arc_heads, arc_capacities, arc_flows, source_reachable_mask)
+
+        # The deficit is measured against the exact capacity of the cut, not the rounded fixed-point flow value
+        crosses_cut = source_reachable_mask[arc_tails] & ~source_reachable_mask[arc_heads]
+        deficit_amount = float(required_demand - flow_network["real_capacities"][crosses_cut].sum())
 
         tight_node_capacities = []
         for node in sorted(self.network_nodes):
             if node not in reachable_original_nodes:
                 continue
-            if internal_node_map[node] == external_node_map[node]:
-                continue
-            node_internal = internal_node_map[node]
-            node_external = external_node_map[node]
-            node_capacity = float(flow_graph[node_internal][node_external]['capacity']) if flow_graph.has_edge(node_internal, node_external) else 0.0
-            flow_through_node = float(flow_dict.get(node_internal, {}).get(node_external, 0.0))
-            if node_capacity - flow_through_node <= NUMERICAL_TOLERANCE:
+            if node in split_arc_index and saturated_arcs[split_arc_index[node]]:
                 tight_node_capacities.append(node)
 
+        # Merged edge pairs occupy the leading arcs; report member edges grouped by pair, in pair order
         tight_edge_list = []
-        for (mapped_source, mapped_target), edge_info_list in mapped_edge_pairs.items():
-            if (mapped_source in source_reachable) and (mapped_target not in source_reachable):
-                edge_capacity = float(flow_graph[mapped_source][mapped_target]['capacity']) if flow_graph.has_edge(mapped_source, mapped_target) else 0.0
-                flow_on_edge = float(flow_dict.get(mapped_source, {}).get(mapped_target, 0.0))
-                if edge_capacity - flow_on_edge <= NUMERICAL_TOLERANCE:
-                    for item in edge_info_list:
-                        tight_edge_list.append({
-                            "from": item["from"],
-                            "to": item["to"],
-                            "flow_needed": float(deficit_amount)
-                        })
+        tight_edges = np.nonzero(tight_cut_arcs[:num_pairs][edge_pair_ids])[0]
+        for edge_idx in tight_edges[np.argsort(edge_pair_ids[tight_edges], kind='stable')]:
+            edge = self.network_edges[edge_idx]
+            tight_edge_list.append({
+                "from": edge["from"],
+                "to": edge["to"],
+                "flow_needed": deficit_amount
+            })
 
         return {
             "status": "infeasible",
@@ -185,14 +406,21 @@ class BeltsSolver:
         }
 
 
-def main():
+def error_payload(e):
+    """Reports an exception as a belts status-error payload."""
+    return {"status": "error", "message": str(e), "type": type(e).__name__}
+
+
+def solve(data):
+    """Solves one belts request, reporting any failure as an error payload instead of raising."""
     try:
-        input_data = json.load(sys.stdin)
-        solver = BeltsSolver(input_data)
-        out = solver.solve()
-        print(json.dumps(out, indent=2))
+        return BeltsSolver(data).solve()
     except Exception as e:
-        print(json.dumps({"status": "error", "message": str(e), "type": type(e).__name__}, indent=2))
+        return error_payload(e)
+
+
+def main():
+    run_solver_cli(solve, error_payload)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,19 @@
+import os
 import sys
-import json
 import numpy as np
-from scipy.optimize import linprog
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import csc_matrix, csr_matrix, hstack, vstack
+
+if not __package__:
+    # Run as a script (python factory/main.py): make the shared solver_io module next to this package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from solver_io import run_solver_cli
+
+
+def _compute_slack(inequality_matrix, lower_bounds, upper_bounds, solution_vector):
+    """Computes the remaining room to the upper and lower bound of every two-sided row lb <= A @ x <= ub."""
+    row_activity = inequality_matrix @ solution_vector
+    return upper_bounds - row_activity, row_activity - lower_bounds
 
 class FactorySolver:
     """Solves the factory production optimization problem using linear programming."""
@@ -16,37 +28,52 @@ class FactorySolver:
         
         self.material_index_map = {name: i for i, name in enumerate(self.all_materials)}
         self.recipe_index_map = {name: i for i, name in enumerate(self.recipe_list)}
+        self.machine_index_map = {name: i for i, name in enumerate(self.machine_type_list)}
         
         self.effective_crafts_per_min = self._calculate_effective_crafts()
         self.productivity_multipliers = self._get_productivity_multipliers()
         self.numerical_tolerance = 1e-6
 
+        # Dense stoichiometry tables (recipes x materials), built once and sliced by every constraint block
+        self.input_matrix, self.output_matrix = self._build_stoichiometry_matrices()
+        self.productivity_vector = np.array([self.productivity_multipliers[recipe_name] for recipe_name in self.recipe_list])
+        self.net_production_matrix = self.output_matrix * self.productivity_vector[:, None] - self.input_matrix
+        self.raw_material_columns = [self.material_index_map[raw_material_name] for raw_material_name in self.raw_materials]
+
+        # Sparse copy of the net production table, shared by every solve() so constraint rows are sliced
+        # without dense temporaries; the extra trailing column stays empty for materials no recipe touches
+        self.untouched_material_column = len(self.all_materials)
+        self.net_production_columns = hstack([csc_matrix(self.net_production_matrix), csc_matrix((len(self.recipe_list), 1))], format='csc')
+
+        # Machines used per craft/min for each recipe, and the machine type each recipe runs on
+        self.inverse_crafts_per_min = np.array([1.0 / self.effective_crafts_per_min[recipe_name] for recipe_name in self.recipe_list])
+        self.recipe_machine_indices = np.array([self.machine_index_map[self.data['recipes'][recipe_name]['machine']] for recipe_name in self.recipe_list], dtype=int)
+
     def solve(self):
         objective_coefficients = self._build_objective_function()
 
-        inequality_matrix, inequality_bounds, constraint_info = self._build_inequality_constraints()
-        equality_matrix, equality_bounds = self._build_equality_constraints()
-        variable_bounds = (0, None)
-        
-        optimization_result = linprog(objective_coefficients, A_ub=inequality_matrix, b_ub=inequality_bounds, 
-                                     A_eq=equality_matrix, b_eq=equality_bounds, bounds=variable_bounds, method='highs')
+        inequality_matrix, lower_bounds, upper_bounds, constraint_info = self._build_inequality_constraints()
+        equality_matrix, equality_bounds, materials_to_balance = self._build_equality_constraints()
+        inequality_constraint = LinearConstraint(inequality_matrix, lower_bounds, upper_bounds)
+        equality_constraint = LinearConstraint(equality_matrix, equality_bounds, equality_bounds)
+
+        # milp without integrality is a plain HiGHS LP that accepts two-sided rows
+        optimization_result = milp(objective_coefficients, constraints=[inequality_constraint, equality_constraint],
+                                   bounds=Bounds(0, np.inf))
 
         if optimization_result.success:
             return self._format_success_output(optimization_result.x)
         
-        maximization_info = self._maximize_target(inequality_matrix, inequality_bounds)
+        maximization_info = self._maximize_target(inequality_constraint, equality_matrix, materials_to_balance)
         if not maximization_info['success']:
             return {"status": "infeasible", "max_feasible_target_per_min": 0.0, "bottleneck_hint": []}
         
-        bottleneck_hints = self._get_bottleneck_hints(maximization_info['result'], constraint_info, inequality_matrix, inequality_bounds)
+        bottleneck_hints = self._get_bottleneck_hints(maximization_info['result'], constraint_info, inequality_matrix, lower_bounds, upper_bounds)
         return {"status": "infeasible", "max_feasible_target_per_min": float(maximization_info['max_target']), "bottleneck_hint": bottleneck_hints}
     
     def _build_objective_function(self):
         """Builds the objective function coefficients (minimize total machine count)."""
-        objective_coefficients = np.zeros(len(self.recipe_list))
-        for recipe_idx, recipe_name in enumerate(self.recipe_list):
-            objective_coefficients[recipe_idx] = 1.0 / self.effective_crafts_per_min[recipe_name]
-        return objective_coefficients
+        return self.inverse_crafts_per_min.copy()
 
     def _build_equality_constraints(self):
         """Builds matrices for material balance equations (intermediates and target)."""
@@ -57,72 +84,47 @@ class FactorySolver:
         materials_to_balance = sorted(list(set(materials_to_balance)))
         
         num_equality_constraints = len(materials_to_balance)
-        num_recipes = len(self.recipe_list)
-        
-        equality_matrix = np.zeros((num_equality_constraints, num_recipes))
-        equality_bounds = np.zeros(num_equality_constraints)
 
-        for constraint_idx, material_name in enumerate(materials_to_balance):
-            for recipe_idx, recipe_name in enumerate(self.recipe_list):
-                recipe = self.data['recipes'][recipe_name]
-                # Net production = production - consumption
-                output_amount = recipe['out'].get(material_name, 0) * self.productivity_multipliers[recipe_name]
-                input_amount = recipe['in'].get(material_name, 0)
-                equality_matrix[constraint_idx, recipe_idx] = output_amount - input_amount
+        # Net production = production - consumption; a target no recipe touches maps to the empty column
+        balance_columns = [self.material_index_map.get(material_name, self.untouched_material_column) for material_name in materials_to_balance]
+        equality_matrix = self.net_production_columns[:, balance_columns].T.tocsr()
 
-            if material_name == target_material:
-                equality_bounds[constraint_idx] = self.data['target']['rate_per_min']
-            else:
-                equality_bounds[constraint_idx] = 0
-        
-        return equality_matrix, equality_bounds
+        equality_bounds = np.zeros(num_equality_constraints)
+        if target_material in materials_to_balance:
+            equality_bounds[materials_to_balance.index(target_material)] = self.data['target']['rate_per_min']
+
+        return equality_matrix, equality_bounds, materials_to_balance
 
     def _build_inequality_constraints(self):
-        """Builds matrices for machine capacity constraints and raw material constraints."""
+        """Builds two-sided rows for machine capacity constraints and raw material constraints."""
         num_machine_constraints = len(self.machine_type_list)
-        num_raw_supply_constraints = len(self.raw_materials)
-        # Add a constraint per raw material to prevent net production
-        num_raw_nonproduction_constraints = len(self.raw_materials)
+        num_raw_constraints = len(self.raw_materials)
         num_recipes = len(self.recipe_list)
         
-        total_constraints = num_machine_constraints + num_raw_supply_constraints + num_raw_nonproduction_constraints
-        inequality_matrix = np.zeros((total_constraints, num_recipes))
-        inequality_bounds = np.zeros(total_constraints)
+        total_constraints = num_machine_constraints + num_raw_constraints
+        lower_bounds = np.full(total_constraints, -np.inf)
+        upper_bounds = np.zeros(total_constraints)
         constraint_info = []
 
-        # Machine capacity constraints
+        # Machine capacity constraints: each recipe contributes 1/effective_crafts to its machine's row
+        machine_block = csr_matrix((self.inverse_crafts_per_min, (self.recipe_machine_indices, np.arange(num_recipes))),
+                                   shape=(num_machine_constraints, num_recipes))
         for machine_idx, machine_type in enumerate(self.machine_type_list):
-            for recipe_idx, recipe_name in enumerate(self.recipe_list):
-                if self.data['recipes'][recipe_name]['machine'] == machine_type:
-                    inequality_matrix[machine_idx, recipe_idx] = 1.0 / self.effective_crafts_per_min[recipe_name]
-            inequality_bounds[machine_idx] = self.data['limits']['max_machines'].get(machine_type, float('inf'))
+            upper_bounds[machine_idx] = self.data['limits']['max_machines'].get(machine_type, float('inf'))
             constraint_info.append({"type": "machine_cap", "name": machine_type})
 
-        # Raw material supply constraints (net consumption <= cap) 
+        # Raw materials: 0 <= net consumption <= cap, one row per material instead of a sign-flipped pair
+        raw_net_consumption = -self.net_production_columns[:, self.raw_material_columns].T.tocsr()
+        raw_start = num_machine_constraints
+        lower_bounds[raw_start:] = 0.0
         for raw_idx, raw_material_name in enumerate(self.raw_materials):
-            constraint_idx = num_machine_constraints + raw_idx
-            for recipe_idx, recipe_name in enumerate(self.recipe_list):
-                recipe = self.data['recipes'][recipe_name]
-                # Net consumption = consumption - production
-                input_amount = recipe['in'].get(raw_material_name, 0)
-                output_amount = recipe['out'].get(raw_material_name, 0) * self.productivity_multipliers[recipe_name]
-                inequality_matrix[constraint_idx, recipe_idx] = input_amount - output_amount
-            inequality_bounds[constraint_idx] = self.data['limits']['raw_supply_per_min'].get(raw_material_name, float('inf'))
-            constraint_info.append({"type": "raw_net_nonpos", "name": raw_material_name})
-
-        # Raw material net production constraint (net production <= 0) 
-        for raw_idx, raw_material_name in enumerate(self.raw_materials):
-            constraint_idx = num_machine_constraints + num_raw_supply_constraints + raw_idx
-            for recipe_idx, recipe_name in enumerate(self.recipe_list):
-                recipe = self.data['recipes'][recipe_name]
-                # Net production = production - consumption
-                input_amount = recipe['in'].get(raw_material_name, 0)
-                output_amount = recipe['out'].get(raw_material_name, 0) * self.productivity_multipliers[recipe_name]
-                inequality_matrix[constraint_idx, recipe_idx] = output_amount - input_amount
-            inequality_bounds[constraint_idx] = 0 # Net production must be <= 0
-            constraint_info.append({"type": "raw_cap", "name": raw_material_name})
-            
-        return inequality_matrix, inequality_bounds, constraint_info
+            upper_bounds[raw_start + raw_idx] = self.data['limits']['raw_supply_per_min'].get(raw_material_name, float('inf'))
+            constraint_info.append({"type": "raw_supply", "name": raw_material_name})
+
+        # HiGHS consumes CSR input directly; the blocks are mostly zeros on real recipe graphs
+        inequality_matrix = vstack([machine_block, raw_net_consumption], format='csr')
+
+        return inequality_matrix, lower_bounds, upper_bounds, constraint_info
         
     def _identify_and_categorize_materials(self):
         """Finds all unique materials and categorizes them as raw, intermediate, or other."""
@@ -140,6 +142,20 @@ class FactorySolver:
         all_material_set = all_input_materials.union(all_output_materials)
         self.all_materials = sorted(list(all_material_set))
 
+    def _build_stoichiometry_matrices(self):
+        """Builds dense per-recipe input and output amount tables indexed by (recipe, material)."""
+        num_recipes = len(self.recipe_list)
+        num_materials = len(self.all_materials)
+        input_matrix = np.zeros((num_recipes, num_materials))
+        output_matrix = np.zeros((num_recipes, num_materials))
+        for recipe_idx, recipe_name in enumerate(self.recipe_list):
+            recipe = self.data['recipes'][recipe_name]
+            for material_name, amount in recipe.get('in', {}).items():
+                input_matrix[recipe_idx, self.material_index_map[material_name]] = amount
+            for material_name, amount in recipe.get('out', {}).items():
+                output_matrix[recipe_idx, self.material_index_map[material_name]] = amount
+        return input_matrix, output_matrix
+
     def _calculate_effective_crafts(self):
         """Calculates effective crafts per minute for each recipe."""
         effective_crafts = {}
@@ -160,111 +176,76 @@ class FactorySolver:
             productivity_mult[recipe_name] = 1 + productivity_modifier
         return productivity_mult
     
-    def _maximize_target(self, inequality_matrix, inequality_bounds):
+    def _maximize_target(self, inequality_constraint, equality_matrix, materials_to_balance):
         """Maximizes target production when primary optimization is infeasible."""
         target_material = self.data.get('target', {}).get('item', None)
         if not target_material:
             return {"success": False}
         
+        # Net target production per craft; all zeros if no recipe touches the target
+        target_net_production = np.zeros(len(self.recipe_list))
+        if target_material in self.material_index_map:
+            target_net_production = self.net_production_matrix[:, self.material_index_map[target_material]]
+
         # Minimize negative of target production (i.e., maximize target production)
-        objective_coefficients = []
-        for recipe in self.recipe_list:
-            recipe_data = self.data['recipes'][recipe]
-            output_target = recipe_data.get('out', {}).get(target_material, 0.0) * self.productivity_multipliers.get(recipe, 1.0)
-            input_target = recipe_data.get('in', {}).get(target_material, 0.0)
-            objective_coefficients.append(- (output_target - input_target))
-        
-        # Equality constraints: all non-raw materials except target must be balanced
-        equality_rows = []
-        equality_rhs = []
-        for material in self.all_materials:
-            if material in self.raw_materials or material == target_material:
-                continue
-            row = []
-            for recipe in self.recipe_list:
-                recipe_data = self.data['recipes'][recipe]
-                output_amount = recipe_data.get('out', {}).get(material, 0.0) * self.productivity_multipliers.get(recipe, 1.0)
-                input_amount = recipe_data.get('in', {}).get(material, 0.0)
-                row.append(output_amount - input_amount)
-            equality_rows.append(row)
-            equality_rhs.append(0.0)
-
-        variable_bounds = [(0, None)] * len(self.recipe_list)
-        optimization_result = linprog(c=objective_coefficients, A_ub=inequality_matrix, b_ub=inequality_bounds, 
-                                     A_eq=equality_rows if equality_rows else None,
-                                     b_eq=equality_rhs if equality_rhs else None, bounds=variable_bounds, method='highs')
+        objective_coefficients = -target_net_production
+
+        # Equality constraints: reuse the balance rows from solve() minus the target row, all balanced to zero
+        keep_rows = np.array([material != target_material for material in materials_to_balance], dtype=bool)
+        equality_rows = equality_matrix[keep_rows]
+        equality_rhs = np.zeros(equality_rows.shape[0])
+        constraints = [inequality_constraint]
+        if equality_rows.shape[0] > 0:
+            constraints.append(LinearConstraint(equality_rows, equality_rhs, equality_rhs))
+
+        optimization_result = milp(objective_coefficients, constraints=constraints, bounds=Bounds(0, np.inf))
         
         if not optimization_result.success:
             return {"success": False, "result": optimization_result}
         
-        solution_vector = optimization_result.x
-        achieved_target = 0.0
-        for recipe_idx, recipe in enumerate(self.recipe_list):
-            recipe_data = self.data['recipes'][recipe]
-            output_target = recipe_data.get('out', {}).get(target_material, 0.0) * self.productivity_multipliers.get(recipe, 1.0)
-            input_target = recipe_data.get('in', {}).get(target_material, 0.0)
-            achieved_target += (output_target - input_target) * solution_vector[recipe_idx]
-        
+        achieved_target = target_net_production @ optimization_result.x
+
         return {"success": True, "max_target": float(achieved_target), "result": optimization_result}
     
-    def _get_bottleneck_hints(self, optimization_result, constraint_info, inequality_matrix, inequality_bounds):
+    def _get_bottleneck_hints(self, optimization_result, constraint_info, inequality_matrix, lower_bounds, upper_bounds):
         """Generates hints about which constraints are bottlenecks in infeasible case."""
         hints = []
         if not hasattr(optimization_result, 'x') or optimization_result.x is None:
             return hints
         
-        slack_values = getattr(optimization_result, 'slack', None)
-        if slack_values is None:
-            slack_values = []
-            solution_vector = optimization_result.x
-            for constraint_row, constraint_bound in zip(inequality_matrix, inequality_bounds):
-                lhs = sum(constraint_row[i] * solution_vector[i] for i in range(len(solution_vector)))
-                slack_values.append(constraint_bound - lhs)
+        upper_slack, lower_slack = _compute_slack(inequality_matrix, lower_bounds, upper_bounds, optimization_result.x)
         
-        for slack_val, info in zip(slack_values, constraint_info):
-            if slack_val is None:
-                continue
-            if slack_val <= max(self.numerical_tolerance, 1e-6):
-                if info['type'] == 'machine_cap':
-                    hints.append(f"{info['name']} cap")
-                elif info['type'] == 'raw_cap':
-                    hints.append(f"{info['name']} supply")
-                elif info['type'] == 'raw_net_nonpos':
-                    hints.append(f"{info['name']} production restriction")
-                else:
-                    hints.append(info.get('name', 'constraint'))
+        # Binding rows are found with one mask per side; rows bounded only by infinity never bind
+        binding_tolerance = max(self.numerical_tolerance, 1e-6)
+        for row_idx in np.nonzero(upper_slack <= binding_tolerance)[0]:
+            info = constraint_info[row_idx]
+            if info['type'] == 'machine_cap':
+                hints.append(f"{info['name']} cap")
+            elif info['type'] == 'raw_supply':
+                hints.append(f"{info['name']} production restriction")
+            else:
+                hints.append(info.get('name', 'constraint'))
+        for row_idx in np.nonzero(lower_slack <= binding_tolerance)[0]:
+            info = constraint_info[row_idx]
+            if info['type'] == 'raw_supply':
+                hints.append(f"{info['name']} supply")
         
         # Remove duplicates while preserving order
-        unique_hints = []
-        seen = set()
-        for hint in hints:
-            if hint not in seen:
-                unique_hints.append(hint)
-                seen.add(hint)
-        
-        return unique_hints
+        return list(dict.fromkeys(hints))
 
     def _format_success_output(self, solution_vector):
         """Formats the LP solution into the required JSON structure."""
         per_recipe_crafts = {
-            self.recipe_list[i]: val for i, val in enumerate(solution_vector)
+            self.recipe_list[i]: float(val) for i, val in enumerate(solution_vector)
         }
         
-        per_machine_machine_counts = {mtype: 0.0 for mtype in self.machine_type_list}
-        for recipe_idx, recipe_name in enumerate(self.recipe_list):
-            machine_type = self.data['recipes'][recipe_name]['machine']
-            machines_used = solution_vector[recipe_idx] / self.effective_crafts_per_min[recipe_name]
-            per_machine_machine_counts[machine_type] += machines_used
-
-        raw_material_consumption = {raw_material: 0.0 for raw_material in self.raw_materials}
-        for raw_material_name in self.raw_materials:
-            net_consumption = 0.0
-            for recipe_idx, recipe_name in enumerate(self.recipe_list):
-                recipe = self.data['recipes'][recipe_name]
-                input_val = recipe.get('in', {}).get(raw_material_name, 0)
-                output_val = recipe.get('out', {}).get(raw_material_name, 0) * self.productivity_multipliers[recipe_name]
-                net_consumption += (input_val - output_val) * solution_vector[recipe_idx]
-            raw_material_consumption[raw_material_name] = net_consumption
+        machines_used = np.bincount(self.recipe_machine_indices, weights=solution_vector * self.inverse_crafts_per_min,
+                                    minlength=len(self.machine_type_list))
+        per_machine_machine_counts = {mtype: float(machines_used[machine_idx]) for machine_idx, mtype in enumerate(self.machine_type_list)}
+
+        # Net consumption = consumption - production, summed over recipes
+        net_consumption = -(solution_vector @ self.net_production_matrix[:, self.raw_material_columns])
+        raw_material_consumption = {raw_material_name: float(net_consumption[raw_idx]) for raw_idx, raw_material_name in enumerate(self.raw_materials)}
 
         return {
             "status": "ok",
@@ -273,15 +254,19 @@ class FactorySolver:
             "raw_consumption_per_min": raw_material_consumption
         }
 
-def main():
+def error_payload(e):
+    """Reports an exception as a factory status-error payload."""
+    return {"status": "error", "message": str(e)}
+
+def solve(data):
+    """Solves one factory request, reporting any failure as an error payload instead of raising."""
     try:
-        input_data = json.load(sys.stdin)
-        solver = FactorySolver(input_data)
-        solution = solver.solve()
-        print(json.dumps(solution, indent=2))
+        return FactorySolver(data).solve()
     except Exception as e:
-        error_output = {"status": "error", "message": str(e)}
-        print(json.dumps(error_output, indent=2))
+        return error_payload(e)
+
+def main():
+    run_solver_cli(solve, error_payload)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,14 @@
 import os
 import sys
 import json
+import importlib
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
+from solver_io import parse_json
+
 def run_test_command(command, input_file_path):
     """Execute solver command with given input file and return parsed JSON output."""
     with open(input_file_path, 'r') as input_file:
@@ -21,7 +26,7 @@ def run_test_command(command, input_file_path):
         if command_execution.returncode != 0:
             print(f"Error running command. Stderr:\n{command_execution.stderr}")
             return None
-        return json.loads(command_execution.stdout)
+        return parse_json(command_execution.stdout)
     except subprocess.TimeoutExpired:
         print("Command timed out after 10 seconds.")
         return None
@@ -32,7 +37,27 @@ def run_test_command(command, input_file_path):
         print(f"An unexpected error occurred: {exception}")
         return None
 
-def main(factory_command, belts_command):
+def run_in_process(solve, input_file_path):
+    """Solve the given input file in this interpreter, returning an error payload like the CLI on bad input."""
+    try:
+        input_data = parse_json(Path(input_file_path).read_bytes())
+    except Exception as exception:
+        return {"status": "error", "message": str(exception)}
+    return solve(input_data)
+
+def run_samples_in_parallel(run_sample, input_files):
+    """Run every input file concurrently through run_sample, returning outputs in input order."""
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(run_sample, input_files))
+
+def get_sample_runner(command, kind):
+    """Uses the external solver command when one is given, otherwise imports the kind's solver and solves in-process."""
+    if command:
+        return partial(run_test_command, command)
+    solve = importlib.import_module(f"{kind}.main").solve
+    return partial(run_in_process, solve)
+
+def main(factory_command=None, belts_command=None):
     """Run sample tests for both factory and belts solvers."""
     samples_directory = Path("tests") / "samples"
     if not samples_directory.is_dir():
@@ -44,17 +69,15 @@ def main(factory_command, belts_command):
     print("=" * 50)
     
     factory_input_files = sorted(list(samples_directory.glob("factory_*.in.json")))
-    for input_file in factory_input_files:
+    factory_outputs = run_samples_in_parallel(get_sample_runner(factory_command, "factory"), factory_input_files)
+    for input_file, actual_output_data in zip(factory_input_files, factory_outputs):
         print(f"Testing {input_file.name}...")
         output_file = input_file.with_suffix('').with_suffix('.out.json')
         if not output_file.exists():
             print(f"  Warning: Corresponding output file {output_file.name} not found. Skipping verification.")
             continue
         
-        with open(output_file, 'r') as expected_output_file:
-            expected_output_data = json.load(expected_output_file)
-        
-        actual_output_data = run_test_command(factory_command, input_file)
+        expected_output_data = parse_json(output_file.read_bytes())
         
         if actual_output_data:
             if actual_output_data.get("status") == expected_output_data.get("status"):
@@ -67,18 +90,16 @@ def main(factory_command, belts_command):
     print("=" * 50)
     
     belts_input_files = sorted(list(samples_directory.glob("belts_*.in.json")))
-    for input_file in belts_input_files:
+    belts_outputs = run_samples_in_parallel(get_sample_runner(belts_command, "belts"), belts_input_files)
+    for input_file, actual_output_data in zip(belts_input_files, belts_outputs):
         print(f"Testing {input_file.name}...")
         output_file = input_file.with_suffix('').with_suffix('.out.json')
         if not output_file.exists():
             print(f"  Warning: Corresponding output file {output_file.name} not found. Skipping verification.")
             continue
 
-        with open(output_file, 'r') as expected_output_file:
-            expected_output_data = json.load(expected_output_file)
+        expected_output_data = parse_json(output_file.read_bytes())
 
-        actual_output_data = run_test_command(belts_command, input_file)
-        
         if actual_output_data:
             if actual_output_data.get("status") == expected_output_data.get("status"):
                 print("  ✓ Status OK")
@@ -91,9 +112,10 @@ def main(factory_command, belts_command):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python run_samples.py \"<factory_command>\" \"<belts_command>\"")
+    if len(sys.argv) not in (1, 3):
+        print("Usage: python run_samples.py [\"<factory_command>\" \"<belts_command>\"]")
         print("Example: python run_samples.py \"python factory/main.py\" \"python belts/main.py\"")
+        print("Without commands, the solvers are imported and run in-process.")
         sys.exit(1)
     
-    main(sys.argv[1], sys.argv[2])
+    main(*sys.argv[1:])
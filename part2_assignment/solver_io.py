@@ -0,0 +1,76 @@
+"""JSON input/output shared by the factory and belts solver entry points, the sample runner and the tests."""
+import sys
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library codec
+    orjson = None
+
+
+def parse_json(raw_input):
+    """Parses a JSON document from bytes or str, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(raw_input)
+    return json.loads(raw_input)
+
+
+def dump_json_bytes(payload):
+    """Serializes the payload to compact UTF-8 JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload).encode()
+
+
+def read_json_input():
+    """Reads the JSON request from stdin, parsing the raw bytes with orjson when it is installed."""
+    return parse_json(sys.stdin.buffer.read())
+
+
+def write_json_output(payload):
+    """Writes the payload to stdout as indented JSON, serializing with orjson when it is installed."""
+    if orjson is not None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        json.dump(payload, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+def write_json_line(payload):
+    """Writes the payload as one compact JSON line and flushes it."""
+    sys.stdout.flush()
+    sys.stdout.buffer.write(dump_json_bytes(payload) + b"\n")
+    sys.stdout.buffer.flush()
+
+
+def serve(solve, error_payload, batch=False):
+    """Answers newline-delimited JSON requests on stdin with one JSON line each on stdout until stdin closes.
+
+    In batch mode every line is a JSON array of requests and the response line is the array of their results;
+    any other JSON value gets a single error response instead.
+    """
+    for line in sys.stdin.buffer:
+        if not line.strip():
+            continue
+        try:
+            request = parse_json(line)
+            if batch and not isinstance(request, list):
+                raise ValueError("batch request must be a JSON array of requests")
+            result = [solve(data) for data in request] if batch else solve(request)
+        except ValueError as e:
+            result = error_payload(e)
+        write_json_line(result)
+
+
+def run_solver_cli(solve, error_payload, argv=None):
+    """Runs a solver entry point: one request from stdin to indented JSON, or a request loop with --server [--batch]."""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--server" in argv:
+        serve(solve, error_payload, batch="--batch" in argv)
+        return
+    try:
+        write_json_output(solve(read_json_input()))
+    except Exception as e:
+        write_json_output(error_payload(e))
@@ -0,0 +1,143 @@
+import os
+import sys
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import pytest
+
+def split_solver_command(command):
+    """Splits a solver command line into argv without a shell.
+
+    On Windows the split keeps backslashes in paths and drops only surrounding double quotes, and the program is
+    resolved through PATH/PATHEXT so .bat shortcuts such as the ones in how_to_make_commands.txt still launch.
+    """
+    if os.name != "nt":
+        return shlex.split(command)
+    argv = [arg[1:-1] if len(arg) >= 2 and arg[0] == arg[-1] == '"' else arg for arg in shlex.split(command, posix=False)]
+    if argv:
+        argv[0] = shutil.which(argv[0]) or argv[0]
+    return argv
+
+def default_solver_command(kind):
+    """The bundled solver script run by this interpreter, independent of the directory pytest is started from."""
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return [sys.executable, os.path.join(project_root, kind, "main.py")]
+
+FACTORY_CMD = split_solver_command(os.environ["FACTORY_CMD"]) if "FACTORY_CMD" in os.environ else default_solver_command("factory")
+BELTS_CMD = split_solver_command(os.environ["BELTS_CMD"]) if "BELTS_CMD" in os.environ else default_solver_command("belts")
+
+# pytest.ini puts the project root on sys.path, so the solver packages and solver_io import directly
+from solver_io import dump_json_bytes, parse_json
+
+# Solve in-process unless a solver command was given explicitly or the solver modules cannot be imported
+IN_PROCESS_SOLVERS = {}
+try:
+    if "FACTORY_CMD" not in os.environ:
+        from factory.main import solve as factory_solve
+        IN_PROCESS_SOLVERS["factory"] = factory_solve
+except ImportError:
+    pass
+try:
+    if "BELTS_CMD" not in os.environ:
+        from belts.main import solve as belts_solve
+        IN_PROCESS_SOLVERS["belts"] = belts_solve
+except ImportError:
+    pass
+
+# Per-solve deadlines carried over from the original one-process-per-test helpers
+SOLVE_TIMEOUTS = {"factory": 10, "belts": 2}
+
+class SolverDaemon:
+    """A solver running in --server --batch mode over binary pipes, with stderr captured to a temporary file."""
+
+    def __init__(self, command, solve_timeout):
+        self.solve_timeout = solve_timeout
+        # A file rather than a pipe, so a chatty solver can never block on a stderr buffer nobody drains
+        self.stderr_log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            command + ["--server", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self.stderr_log
+        )
+
+    def read_stderr(self):
+        """Returns everything the solver has written to stderr so far."""
+        self.stderr_log.seek(0)
+        return self.stderr_log.read().decode(errors="replace")
+
+    def read_response_line(self, timeout):
+        """Reads one response line, killing the solver and failing the test if none arrives within timeout seconds."""
+        response = []
+        reader = threading.Thread(target=lambda: response.append(self.process.stdout.readline()), daemon=True)
+        reader.start()
+        reader.join(timeout)
+        if reader.is_alive():
+            self.process.kill()
+            reader.join()
+            pytest.fail(f"Solver did not answer within {timeout} seconds. Stderr:\n{self.read_stderr()}")
+        return response[0]
+
+    def close(self):
+        """Closes the daemon's stdin so its request loop ends, killing it if it does not exit promptly."""
+        self.process.stdin.close()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+        self.stderr_log.close()
+
+def run_solver_batch(solver_daemon, inputs):
+    """Helper to send a list of input dicts to a running solver daemon in one line and return the parsed responses."""
+    request_line = dump_json_bytes(inputs)
+    try:
+        solver_daemon.process.stdin.write(request_line + b"\n")
+        solver_daemon.process.stdin.flush()
+    except BrokenPipeError:
+        pytest.fail(f"Solver exited with an error: {solver_daemon.read_stderr()}")
+    response_line = solver_daemon.read_response_line(solver_daemon.solve_timeout * max(len(inputs), 1))
+    assert response_line, f"Solver exited with an error: {solver_daemon.read_stderr()}"
+    responses = parse_json(response_line)
+    assert isinstance(responses, list), f"Solver rejected the batch: {responses}"
+    return responses
+
+# Under pytest-xdist every worker (PYTEST_XDIST_WORKER=gw0, gw1, ...) runs its own session, so each worker
+# starts and owns its daemons; without xdist the single session owns one of each
+@pytest.fixture(scope="session")
+def factory_daemon():
+    """One factory solver process shared by every test in the session."""
+    solver_daemon = SolverDaemon(FACTORY_CMD, SOLVE_TIMEOUTS["factory"])
+    yield solver_daemon
+    solver_daemon.close()
+
+@pytest.fixture(scope="session")
+def belts_daemon():
+    """One belts solver process shared by every test in the session."""
+    solver_daemon = SolverDaemon(BELTS_CMD, SOLVE_TIMEOUTS["belts"])
+    yield solver_daemon
+    solver_daemon.close()
+
+@pytest.fixture(scope="session")
+def daemon_solver(request):
+    """Returns daemon_solver(kind), a callable that solves a list of input dicts through the kind's --server daemon."""
+    def get_daemon_solver(kind):
+        solver_daemon = request.getfixturevalue(f"{kind}_daemon")
+        return lambda inputs: run_solver_batch(solver_daemon, inputs)
+    return get_daemon_solver
+
+@pytest.fixture(scope="session")
+def solver(daemon_solver):
+    """Returns solver(kind), a callable that solves a list of input dicts for "factory" or "belts".
+
+    Importable solvers run in-process with no subprocess or JSON round-trip; otherwise the kind's daemon is used.
+    """
+    def get_solver(kind):
+        if kind in IN_PROCESS_SOLVERS:
+            solve = IN_PROCESS_SOLVERS[kind]
+            return lambda inputs: [solve(input_data) for input_data in inputs]
+        return daemon_solver(kind)
+    return get_solver
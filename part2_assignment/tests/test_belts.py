@@ -1,27 +1,7 @@
-import os
-import json
-import subprocess
 import pytest
 
-BELTS_CMD = os.environ.get("BELTS_CMD", "python belts/main.py")
-
-def run_solver(input_data):
-    """Helper to run the belts solver with given data and return parsed JSON output."""
-    input_json_str = json.dumps(input_data)
-    command_result = subprocess.run(
-        BELTS_CMD,
-        input=input_json_str,
-        capture_output=True,
-        text=True,
-        shell=True,
-        timeout=2
-    )
-    assert command_result.returncode == 0, f"Solver exited with an error: {command_result.stderr}"
-    return json.loads(command_result.stdout)
-
-def test_feasible_belt_network():
-    """Tests a feasible belt network configuration."""
-    input_data = {
+CASES = {
+    "feasible_belt_network": {
         "nodes": ["source_1", "junction_a", "sink"],
         "edges": [
             {"from": "source_1", "to": "junction_a", "hi": 100},
@@ -29,17 +9,8 @@ def test_feasible_belt_network():
         ],
         "sources": [{"name": "source_1", "supply": 50}],
         "sink": {"name": "sink"}
-    }
-    
-    output = run_solver(input_data)
-    
-    assert output["status"] == "ok"
-    assert output["max_flow_per_min"] == pytest.approx(50.0)
-    assert len(output["flows"]) == 2
-
-def test_infeasible_belt_network():
-    """Tests an infeasible belt network with a bottleneck."""
-    input_data = {
+    },
+    "infeasible_belt_network": {
         "nodes": ["source_1", "junction_a", "sink"],
         "edges": [
             {"from": "source_1", "to": "junction_a", "hi": 100},
@@ -47,9 +18,116 @@ def test_infeasible_belt_network():
         ],
         "sources": [{"name": "source_1", "supply": 50}],
         "sink": {"name": "sink"}
-    }
+    },
+    "exactly_feasible_fractional_supplies": {
+        "nodes": ["a", "b", "c", "j", "t"],
+        "edges": [
+            {"from": "a", "to": "j", "hi": 10},
+            {"from": "b", "to": "j", "hi": 10},
+            {"from": "c", "to": "j", "hi": 10},
+            {"from": "j", "to": "t", "hi": 3 * 0.1234566}
+        ],
+        "sources": [
+            {"name": "a", "supply": 0.1234566},
+            {"name": "b", "supply": 0.1234566},
+            {"name": "c", "supply": 0.1234566}
+        ],
+        "sink": {"name": "t"}
+    },
+    "capped_node_and_parallel_edges_cut": {
+        "nodes": ["s1", "s2", "a", "b", "t"],
+        "edges": [
+            {"from": "s2", "to": "t", "hi": 5},
+            {"from": "s1", "to": "a", "hi": 10},
+            {"from": "s1", "to": "a", "hi": 15},  # Parallel to the edge above
+            {"from": "s2", "to": "b", "hi": 100},
+            {"from": "a", "to": "t", "hi": 100},
+            {"from": "b", "to": "t", "hi": 100}
+        ],
+        "node_caps": [
+            {"name": "b", "cap": 30},  # Bottleneck node
+            {"name": "a", "cap": 60}
+        ],
+        "sources": [
+            {"name": "s1", "supply": 40},
+            {"name": "s2", "supply": 50}
+        ],
+        "sink": {"name": "t"}
+    },
+    "large_demand_belt_network": {
+        "nodes": ["s1", "s2", "a", "b", "c", "sink"],
+        "edges": [
+            {"from": "s1", "to": "a", "hi": 900},
+            {"from": "s2", "to": "a", "hi": 600},
+            {"from": "a", "to": "b", "hi": 900},
+            {"from": "a", "to": "c", "hi": 600},
+            {"from": "b", "to": "sink", "hi": 900},
+            {"from": "c", "to": "sink", "hi": 600}
+        ],
+        "node_caps": [{"name": "a", "cap": 1500}],
+        "sources": [
+            {"name": "s1", "supply": 900},
+            {"name": "s2", "supply": 600}
+        ],
+        "sink": {"name": "sink"}
+    },
+    "supply_just_above_capacity": {
+        "nodes": ["a", "b", "c", "j", "t"],
+        "edges": [
+            {"from": "a", "to": "j", "hi": 0.3333333},
+            {"from": "b", "to": "j", "hi": 0.3333333},
+            {"from": "c", "to": "j", "hi": 0.3333333},
+            {"from": "j", "to": "t", "hi": 10}
+        ],
+        "sources": [
+            {"name": "a", "supply": 0.33333335},
+            {"name": "b", "supply": 0.33333335},
+            {"name": "c", "supply": 0.33333335}
+        ],
+        "sink": {"name": "t"}
+    },
+    "large_supply_one_unit_short": {
+        "nodes": ["s", "t"],
+        "edges": [{"from": "s", "to": "t", "hi": 1e10 - 1}],
+        "sources": [{"name": "s", "supply": 1e10}],
+        "sink": {"name": "t"}
+    },
+    "tiny_supply_above_capacity": {
+        "nodes": ["s", "t"],
+        "edges": [{"from": "s", "to": "t", "hi": 1e-8}],
+        "sources": [{"name": "s", "supply": 2e-8}],
+        "sink": {"name": "t"}
+    },
+}
+
+def assert_flows_within_bounds(output, case):
+    """Checks every reported flow against its edge's hi and each source's outflow against its supply."""
+    edge_caps = {(edge["from"], edge["to"]): edge["hi"] for edge in case["edges"]}
+    source_outflow = {source["name"]: 0.0 for source in case["sources"]}
+    for flow in output["flows"]:
+        assert flow["flow"] <= edge_caps[(flow["from"], flow["to"])] + 1e-9
+        if flow["from"] in source_outflow:
+            source_outflow[flow["from"]] += flow["flow"]
+    for source in case["sources"]:
+        assert source_outflow[source["name"]] == pytest.approx(source["supply"], abs=1e-9)
+
+@pytest.fixture(scope="module")
+def belts_outputs(solver):
+    """Solves every case in one batch and returns the responses keyed by case id."""
+    responses = solver("belts")(list(CASES.values()))
+    return dict(zip(CASES, responses))
+
+def test_feasible_belt_network(belts_outputs):
+    """Tests a feasible belt network configuration."""
+    output = belts_outputs["feasible_belt_network"]
     
-    output = run_solver(input_data)
+    assert output["status"] == "ok"
+    assert output["max_flow_per_min"] == pytest.approx(50.0)
+    assert len(output["flows"]) == 2
+
+def test_infeasible_belt_network(belts_outputs):
+    """Tests an infeasible belt network with a bottleneck."""
+    output = belts_outputs["infeasible_belt_network"]
     
     assert output["status"] == "infeasible"
     assert "cut_reachable" in output
@@ -57,3 +135,43 @@ def test_infeasible_belt_network():
     assert "junction_a" in output["cut_reachable"]
     assert "sink" not in output["cut_reachable"]
     assert output["deficit"]["demand_balance"] == pytest.approx(30.0)
+
+def test_capped_node_and_parallel_edges_cut(belts_outputs):
+    """Tests the exact min-cut certificate when it crosses a node cap and a pair of parallel edges."""
+    output = belts_outputs["capped_node_and_parallel_edges_cut"]
+
+    assert output["status"] == "infeasible"
+    assert output["cut_reachable"] == ["b", "s1", "s2"]
+    assert output["deficit"]["demand_balance"] == pytest.approx(30.0)
+    assert output["deficit"]["tight_nodes"] == ["b"]
+    assert [(edge["from"], edge["to"]) for edge in output["deficit"]["tight_edges"]] == [
+        ("s2", "t"), ("s1", "a"), ("s1", "a")
+    ]
+
+def test_exactly_feasible_fractional_supplies(belts_outputs):
+    """Tests that fixed-point rounding does not turn an exactly saturated network infeasible."""
+    output = belts_outputs["exactly_feasible_fractional_supplies"]
+
+    assert output["status"] == "ok"
+    assert output["max_flow_per_min"] == pytest.approx(3 * 0.1234566)
+    assert_flows_within_bounds(output, CASES["exactly_feasible_fractional_supplies"])
+
+def test_large_demand_belt_network(belts_outputs):
+    """Tests that a coarser fixed-point scale for large demands still yields flows within every edge's hi."""
+    output = belts_outputs["large_demand_belt_network"]
+
+    assert output["status"] == "ok"
+    assert output["max_flow_per_min"] == pytest.approx(1500.0)
+    assert_flows_within_bounds(output, CASES["large_demand_belt_network"])
+
+@pytest.mark.parametrize("case_id, deficit", [
+    ("supply_just_above_capacity", 1.5e-7),
+    ("large_supply_one_unit_short", 1.0),
+    ("tiny_supply_above_capacity", 1e-8),
+])
+def test_deficit_below_fixed_point_resolution(belts_outputs, case_id, deficit):
+    """Tests that a deficit smaller than one fixed-point unit is still reported as infeasible."""
+    output = belts_outputs[case_id]
+
+    assert output["status"] == "infeasible"
+    assert output["deficit"]["demand_balance"] == pytest.approx(deficit, rel=1e-6)
@@ -0,0 +1,16 @@
+import os
+import pytest
+from conftest import IN_PROCESS_SOLVERS
+from solver_io import parse_json
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+@pytest.mark.parametrize("kind", ["factory", "belts"])
+def test_cli_matches_in_process_solver(kind, daemon_solver):
+    """Tests that the bundled --server --batch command, including its JSON codec, matches the in-process solver."""
+    if kind not in IN_PROCESS_SOLVERS:
+        pytest.skip(f"{kind} is already tested through its command")
+    with open(os.path.join(SAMPLES_DIR, f"{kind}_0.in.json"), "rb") as sample_file:
+        sample_input = parse_json(sample_file.read())
+
+    assert daemon_solver(kind)([sample_input]) == [IN_PROCESS_SOLVERS[kind](sample_input)]
@@ -1,27 +1,7 @@
-import os
-import json
-import subprocess
 import pytest
 
-FACTORY_CMD = os.environ.get("FACTORY_CMD", "python factory/main.py")
-
-def run_solver(input_data):
-    """Helper to run the solver with given data and return parsed JSON output."""
-    input_json_str = json.dumps(input_data)
-    command_result = subprocess.run(
-        FACTORY_CMD,
-        input=input_json_str,
-        capture_output=True,
-        text=True,
-        shell=True,
-        timeout=10
-    )
-    assert command_result.returncode == 0, f"Solver exited with an error: {command_result.stderr}"
-    return json.loads(command_result.stdout)
-
-def test_feasible_factory_scenario():
-    """Tests a basic, solvable factory layout."""
-    input_data = {
+CASES = {
+    "feasible_factory_scenario": {
       "machines": {"assembler": {"crafts_per_min": 60}},
       "recipes": {
         "iron_gear": {
@@ -34,17 +14,8 @@ def test_feasible_factory_scenario():
         "max_machines": {"assembler": 10}
       },
       "target": {"item": "iron_gear", "rate_per_min": 10}
-    }
-    
-    output = run_solver(input_data)
-    
-    assert output["status"] == "ok"
-    assert output["per_recipe_crafts_per_min"]["iron_gear"] == pytest.approx(10.0)
-    assert output["raw_consumption_per_min"]["iron_plate"] == pytest.approx(20.0)
-
-def test_infeasible_factory_scenario():
-    """Tests a layout that is impossible due to a machine capacity constraint."""
-    input_data = {
+    },
+    "infeasible_factory_scenario": {
       "machines": {"assembler": {"crafts_per_min": 60}},
       "recipes": {
         "iron_gear": {
@@ -57,11 +28,50 @@ def test_infeasible_factory_scenario():
         "max_machines": {"assembler": 1}
       },
       "target": {"item": "iron_gear", "rate_per_min": 5000}
-    }
+    },
+    "infeasible_factory_with_byproduct": {
+      "machines": {"assembler": {"crafts_per_min": 60}},
+      "recipes": {
+        "iron_gear": {
+          "machine": "assembler", "time_s": 0.5,
+          "in": {"iron_plate": 2}, "out": {"iron_gear": 1, "scrap": 1}
+        }
+      },
+      "limits": {
+        "raw_supply_per_min": {"iron_plate": 100},
+        "max_machines": {"assembler": 10}
+      },
+      "target": {"item": "iron_gear", "rate_per_min": 5000}
+    },
+}
+
+@pytest.fixture(scope="module")
+def factory_outputs(solver):
+    """Solves every case in one batch and returns the responses keyed by case id."""
+    responses = solver("factory")(list(CASES.values()))
+    return dict(zip(CASES, responses))
+
+def test_feasible_factory_scenario(factory_outputs):
+    """Tests a basic, solvable factory layout."""
+    output = factory_outputs["feasible_factory_scenario"]
+    
+    assert output["status"] == "ok"
+    assert output["per_recipe_crafts_per_min"]["iron_gear"] == pytest.approx(10.0)
+    assert output["raw_consumption_per_min"]["iron_plate"] == pytest.approx(20.0)
 
-    output = run_solver(input_data)
+def test_infeasible_factory_scenario(factory_outputs):
+    """Tests a layout that is impossible due to a machine capacity constraint."""
+    output = factory_outputs["infeasible_factory_scenario"]
     
     assert output["status"] == "infeasible"
     assert "max_feasible_target_per_min" in output
     assert output["max_feasible_target_per_min"] > 0
     assert "iron_plate production restriction" in output["bottleneck_hint"]
+
+def test_infeasible_factory_with_byproduct(factory_outputs):
+    """Tests that an unconsumed byproduct does not block the maximum feasible rate."""
+    output = factory_outputs["infeasible_factory_with_byproduct"]
+
+    assert output["status"] == "infeasible"
+    assert output["max_feasible_target_per_min"] == pytest.approx(50.0)
+    assert "iron_plate production restriction" in output["bottleneck_hint"]